@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🚦 Состояние алертов по каждому символу
+Гистерезис входа/выхода, кулдауны и уровни эскалации. Таблица состояний живет
+в памяти, на диск дописываются только изменившиеся записи (журнал JSONL),
+который периодически уплотняется.
+
+Цикл работы: observe() для каждого символа возвращает кандидатов на алерт,
+после успешной отправки вызывается mark_sent(), затем checkpoint().
+"""
+
+import json
+import time
+import logging
+
+from artifact_manager import dump_compact, write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class AlertStateEngine:
+    def __init__(self, path='alert_state.jsonl', cooldown_minutes=120,
+                 exit_confirmations=2, stale_minutes=90, compact_ratio=4):
+        # Журнал состояний
+        self.path = path
+
+        # Минимальная пауза перед повторным алертом того же уровня
+        self.cooldown = cooldown_minutes * 60
+        # Сколько циклов подряд должно выполняться условие выхода
+        self.exit_confirmations = exit_confirmations
+        # Активный символ, который не наблюдали столько времени, деактивируется
+        self.stale = stale_minutes * 60
+        # Уплотняем журнал, когда он длиннее таблицы в compact_ratio раз
+        self.compact_ratio = compact_ratio
+
+        # key -> {'active', 'side', 'level', 'rule', 'misses', 'seen', 'last_alert', 'alert_level'}
+        self.states = {}
+        self._dirty = set()
+        self._journal_lines = 0
+
+        self.load()
+
+    def load(self):
+        """Восстанавливаем таблицу из журнала (последняя запись по ключу побеждает)"""
+        damaged = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    # Строка без перевода строки - недописанная запись после прерывания
+                    if not line.endswith('\n'):
+                        damaged = True
+                    self._journal_lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        damaged = True
+                        continue
+                    # Валидный JSON, но не запись {"k", "s"} - тоже считаем повреждением
+                    state = entry.get('s') if isinstance(entry, dict) else None
+                    if not isinstance(entry, dict) or 'k' not in entry or (
+                            state is not None and not (isinstance(state, dict) and 'active' in state and 'side' in state)):
+                        damaged = True
+                        continue
+                    if state is None:
+                        self.states.pop(entry['k'], None)
+                    else:
+                        self.states[entry['k']] = state
+        except FileNotFoundError:
+            pass
+
+        # Перезаписываем поврежденный журнал, чтобы новые записи не склеились с обрывком
+        if damaged:
+            logger.warning(f"⚠️ Журнал {self.path} поврежден, уплотняем")
+            self.compact()
+
+        logger.info(f"🚦 Загружено состояний алертов: {len(self.states)}")
+
+    def active_rule(self, key):
+        """Индекс правила, открывшего активный алерт (или None)"""
+        state = self.states.get(key)
+        return state.get('rule') if state and state['active'] else None
+
+    def observe(self, key, triggered, level=1, side=None, exiting=True, rule=None, now=None):
+        """Обновляем состояние символа, возвращаем уровень кандидата на алерт или None.
+
+        triggered - сработало условие входа, exiting - выполнено условие выхода
+        правила, открывшего алерт. Отправка фиксируется отдельно через mark_sent().
+        """
+        now = now or time.time()
+        state = self.states.get(key)
+
+        if triggered:
+            if state is None or not state['active'] or state['side'] != side:
+                # Вход в состояние алерта
+                suppressed = (
+                    state is not None and state['side'] == side and
+                    state.get('last_alert') and now - state['last_alert'] < self.cooldown and
+                    level <= state.get('alert_level', 0)
+                )
+                # Новый эпизод: пока ничего не доставлено (alert_level 0), если
+                # только он не подавлен кулдауном прошлого алерта
+                state = {
+                    'active': True,
+                    'side': side,
+                    'level': level,
+                    'rule': rule,
+                    'misses': 0,
+                    'seen': now,
+                    'last_alert': state.get('last_alert') if state else None,
+                    'alert_level': state.get('alert_level', 0) if suppressed else 0
+                }
+                self.states[key] = state
+                self._dirty.add(key)
+                return None if suppressed else level
+
+            # Уже активен: сбрасываем счетчик промахов, проверяем эскалацию
+            state['misses'] = 0
+            state['seen'] = now
+            state['rule'] = rule
+            state['level'] = max(state['level'], level)
+            self._dirty.add(key)
+            return level if level > state.get('alert_level', 0) else None
+
+        if state is None or not state['active']:
+            return None
+
+        # Условие входа пропало: держимся, пока не выполнено условие выхода
+        state['seen'] = now
+        if not exiting:
+            state['misses'] = 0
+        else:
+            state['misses'] += 1
+            if state['misses'] >= self.exit_confirmations:
+                self.deactivate(state)
+        self._dirty.add(key)
+        return None
+
+    def mark_sent(self, key, level, now=None):
+        """Фиксируем успешно доставленный алерт"""
+        state = self.states.get(key)
+        if state is None:
+            return
+        state['last_alert'] = now or time.time()
+        state['alert_level'] = level
+        self._dirty.add(key)
+
+    def deactivate(self, state):
+        """Выходим из состояния алерта (кулдаун сохраняется)"""
+        state['active'] = False
+        state['level'] = 0
+        state['misses'] = 0
+        state['rule'] = None
+
+    def expire(self, now=None):
+        """Деактивируем давно не наблюдавшиеся символы и забываем остывшие"""
+        now = now or time.time()
+        for key, state in list(self.states.items()):
+            if state['active']:
+                if now - (state.get('seen') or 0) >= self.stale:
+                    self.deactivate(state)
+                    self._dirty.add(key)
+            elif now - (state.get('last_alert') or 0) >= self.cooldown:
+                del self.states[key]
+                self._dirty.add(key)
+
+    def checkpoint(self):
+        """Дописываем в журнал только изменившиеся состояния"""
+        if not self._dirty:
+            return
+
+        if self._journal_lines + len(self._dirty) > self.compact_ratio * max(len(self.states), 16):
+            self.compact()
+            return
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for key in self._dirty:
+                f.write(dump_compact({'k': key, 's': self.states.get(key)}) + '\n')
+        self._journal_lines += len(self._dirty)
+        self._dirty.clear()
+
+    def compact(self):
+        """Перезаписываем журнал снимком текущей таблицы"""
+        write_atomic(self.path, ''.join(
+            dump_compact({'k': key, 's': state}) + '\n' for key, state in self.states.items()
+        ))
+        self._journal_lines = len(self.states)
+        self._dirty.clear()
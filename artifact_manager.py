@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗄️ Менеджер выходных артефактов бота
+Складывает сигналы в суточные сжатые бандлы, следит за объемом и возрастом
+файлов и держит маленький указатель на последний снимок
+"""
+
+import gzip
+import json
+import os
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Компактная сериализация: без отступов и лишних пробелов
+COMPACT_SEPARATORS = (',', ':')
+
+
+def dump_compact(data):
+    """Сериализуем данные в компактный JSON"""
+    return json.dumps(data, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+
+
+def write_atomic(path, text):
+    """Атомарно перезаписываем небольшой файл (через временный файл)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ArtifactManager:
+    def __init__(self, base_dir='artifacts', latest_file='latest_signals.json',
+                 compress=True, max_age_days=7, max_total_mb=20):
+        # Каталог суточных бандлов
+        self.base_dir = base_dir
+        # Снимок последнего цикла (выгружается артефактом, хранится в кеше)
+        self.latest_file = latest_file
+        # Указатель на последний бандл
+        self.pointer_file = os.path.join(base_dir, 'latest.json')
+
+        # Настройки кодирования и хранения
+        self.compress = compress
+        self.max_age_days = max_age_days
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+
+        # Последний бандл, в который писали (для ротации)
+        self._current_bundle = None
+
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def bundle_name(self, day):
+        """Имя суточного бандла"""
+        suffix = '.jsonl.gz' if self.compress else '.jsonl'
+        return f"signals_{day.strftime('%Y%m%d')}{suffix}"
+
+    def bundle_path(self, day):
+        """Путь к суточному бандлу"""
+        return os.path.join(self.base_dir, self.bundle_name(day))
+
+    def save(self, signals, now=None):
+        """Сохраняем сигналы цикла: дописываем в бандл, обновляем снимок и указатель"""
+        now = now or datetime.now()
+        bundle = self.bundle_path(now)
+        record = dump_compact({'timestamp': now.isoformat(), 'signals': signals})
+
+        # Дописываем одну строку в суточный бандл.
+        # Каждая дозапись в gzip - отдельный member, gzip.open читает их подряд
+        if self.compress:
+            with gzip.open(bundle, 'at', encoding='utf-8') as f:
+                f.write(record + '\n')
+        else:
+            with open(bundle, 'a', encoding='utf-8') as f:
+                f.write(record + '\n')
+
+        # Снимок последнего цикла в компактном виде
+        write_atomic(self.latest_file, dump_compact(signals))
+
+        # Маленький указатель на текущий бандл
+        write_atomic(self.pointer_file, dump_compact({
+            'bundle': os.path.basename(bundle),
+            'timestamp': now.isoformat(),
+            'signals': len(signals)
+        }))
+
+        # Чистим старые бандлы только при смене бандла (раз в сутки или при старте)
+        if bundle != self._current_bundle:
+            self._current_bundle = bundle
+            self.enforce_retention(now)
+
+        logger.info(f"💾 Сигналы сохранены: {bundle}")
+        return bundle
+
+    def list_bundles(self):
+        """Список бандлов от старых к новым"""
+        bundles = []
+        for name in os.listdir(self.base_dir):
+            if name.startswith('signals_') and (name.endswith('.jsonl.gz') or name.endswith('.jsonl')):
+                path = os.path.join(self.base_dir, name)
+                bundles.append((name, path, os.path.getsize(path)))
+        bundles.sort()
+        return bundles
+
+    def enforce_retention(self, now=None):
+        """Удаляем бандлы старше max_age_days и сверх лимита max_total_mb"""
+        now = now or datetime.now()
+        cutoff = (now - timedelta(days=self.max_age_days)).strftime('%Y%m%d')
+        removed = []
+
+        bundles = self.list_bundles()
+
+        # 1. Ограничение по возрасту (дата в имени файла)
+        kept = []
+        for name, path, size in bundles:
+            day = name[len('signals_'):len('signals_') + 8]
+            if day < cutoff and path != self._current_bundle:
+                removed.append(path)
+            else:
+                kept.append((name, path, size))
+
+        # 2. Ограничение по объему: удаляем самые старые, текущий бандл не трогаем
+        total = sum(size for _, _, size in kept)
+        for name, path, size in kept:
+            if total <= self.max_total_bytes:
+                break
+            if path == self._current_bundle:
+                continue
+            removed.append(path)
+            total -= size
+
+        for path in removed:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.error(f"Ошибка удаления артефакта {path}: {e}")
+
+        if removed:
+            logger.info(f"🧹 Удалено старых артефактов: {len(removed)}")
+        return removed
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📚 Локальная история Fear & Greed и цен
+Один раз выкачивает полную историю, дальше каждый цикл догружает только
+новые точки после последней сохраненной. Тренды и индикаторы считаются по
+локальным данным. Докачка продолжается с места остановки.
+"""
+
+import json
+import math
+import os
+import time
+import logging
+from datetime import datetime
+
+from artifact_manager import dump_compact, write_atomic
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+
+class HistoryStore:
+    def __init__(self, session, base_dir='history', coins=None,
+                 backfill_days=365, chunk_days=90, price_interval_minutes=60,
+                 max_age_days=2, trim_slack_days=7):
+        self.session = session
+        self.base_dir = base_dir
+        # Символ -> id монеты в CoinGecko
+        self.coins = coins or {'BTC': 'bitcoin', 'ETH': 'ethereum'}
+
+        # Глубина первичной загрузки цен (и хранения) и размер окна одного запроса
+        self.backfill_days = backfill_days
+        self.chunk_days = chunk_days
+        # Минимальный шаг между сохраненными точками цены
+        self.price_interval = price_interval_minutes * 60
+        # Последняя точка серии старше этого считается устаревшей
+        self.max_age = max_age_days * DAY
+        # Ценовые серии переписываются, когда вылезают за backfill_days на столько дней
+        self.trim_slack = trim_slack_days * DAY
+
+        self.state_file = os.path.join(base_dir, 'sync_state.json')
+
+        # Серии в памяти: имя -> список [ts, value, ...]
+        self._series = {}
+
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.state = self.load_state()
+
+    def load_state(self):
+        """Загружаем курсоры синхронизации"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_state(self):
+        """Атомарно сохраняем курсоры синхронизации"""
+        write_atomic(self.state_file, dump_compact(self.state))
+
+    def series_path(self, name):
+        """Путь к файлу серии"""
+        return os.path.join(self.base_dir, f"{name}.jsonl")
+
+    def series(self, name):
+        """Серия из памяти (с диска читаем один раз за процесс)"""
+        if name not in self._series:
+            points = []
+            try:
+                with open(self.series_path(name), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            points.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            # Недописанная строка после прерывания - пропускаем
+                            continue
+            except FileNotFoundError:
+                pass
+            self._series[name] = points
+        return self._series[name]
+
+    def last_ts(self, name):
+        """Время последней сохраненной точки"""
+        points = self.series(name)
+        return points[-1][0] if points else None
+
+    def append(self, name, points):
+        """Дописываем новые точки в файл и в память"""
+        if not points:
+            return
+        with open(self.series_path(name), 'a', encoding='utf-8') as f:
+            for point in points:
+                f.write(dump_compact(point) + '\n')
+        self.series(name).extend(points)
+
+    def trim(self, name, keep_days):
+        """Обрезаем серию до последних keep_days дней (файл переписываем атомарно)"""
+        points = self.series(name)
+        cutoff = time.time() - keep_days * DAY
+        if not points or points[0][0] >= cutoff - self.trim_slack:
+            return
+
+        kept = [point for point in points if point[0] >= cutoff]
+        write_atomic(self.series_path(name), ''.join(dump_compact(point) + '\n' for point in kept))
+        self._series[name] = kept
+        logger.info(f"✂️ {name}: удалено {len(points) - len(kept)} старых точек")
+
+    def is_stale(self, name):
+        """Последняя точка серии старше max_age (догрузка не удается)"""
+        last = self.last_ts(name)
+        if last is None or time.time() - last > self.max_age:
+            ts = datetime.fromtimestamp(last).isoformat() if last else 'нет данных'
+            logger.warning(f"⚠️ Серия {name} устарела: последнее значение от {ts}")
+            return True
+        return False
+
+    def sync_fear_greed(self):
+        """Догружаем Fear & Greed: полная история в первый раз, дальше только дельта"""
+        name = 'fear_greed'
+        last = self.last_ts(name)
+
+        # limit=0 отдает всю историю, иначе берем дни с последней точки с запасом
+        limit = 0 if last is None else max(math.ceil((time.time() - last) / DAY) + 1, 1)
+
+        try:
+            response = self.session.get(
+                "https://api.alternative.me/fng/",
+                params={'limit': limit, 'format': 'json'},
+                timeout=15
+            )
+            response.raise_for_status()
+            data = response.json().get('data') or []
+
+            points = sorted(
+                [int(item['timestamp']), int(item['value']), item.get('value_classification', '')]
+                for item in data
+            )
+            new_points = [p for p in points if last is None or p[0] > last]
+            self.append(name, new_points)
+
+            if new_points:
+                logger.info(f"📚 Fear & Greed: +{len(new_points)} точек")
+            return len(new_points)
+
+        except Exception as e:
+            logger.error(f"Ошибка синхронизации истории Fear & Greed: {e}")
+            return 0
+
+    def sync_prices(self, coin_id):
+        """Догружаем историю цены окнами market_chart/range с сохранением курсора"""
+        name = f"price_{coin_id}"
+        now = int(time.time())
+        last = self.last_ts(name)
+
+        # Курсор из состояния, но не раньше последней точки (на случай прерывания)
+        cursor = self.state.get(name, {}).get('cursor') or (now - self.backfill_days * DAY)
+        if last is not None:
+            cursor = max(cursor, last)
+
+        added = 0
+        try:
+            while cursor < now:
+                end = min(cursor + self.chunk_days * DAY, now)
+
+                response = self.session.get(
+                    f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart/range",
+                    params={'vs_currency': 'usd', 'from': cursor, 'to': end},
+                    timeout=20
+                )
+                response.raise_for_status()
+                prices = response.json().get('prices') or []
+
+                # Прореживаем до price_interval, чтобы шаг серии был одинаковым
+                new_points = []
+                kept = last
+                for ts_ms, price in prices:
+                    ts = int(ts_ms // 1000)
+                    if kept is None or ts >= kept + self.price_interval:
+                        new_points.append([ts, price])
+                        kept = ts
+
+                self.append(name, new_points)
+                added += len(new_points)
+                last = kept
+
+                # Курсор сохраняем после каждого окна - можно продолжить после обрыва
+                cursor = end
+                self.state[name] = {'cursor': cursor}
+                self.save_state()
+
+                if cursor < now:
+                    time.sleep(2)  # Пауза между окнами (лимиты CoinGecko)
+
+        except Exception as e:
+            logger.error(f"Ошибка синхронизации истории цены {coin_id}: {e}")
+
+        if added:
+            logger.info(f"📚 {coin_id}: +{added} точек цены")
+
+        # Храним не больше backfill_days (переписываем раз в trim_slack_days)
+        self.trim(name, self.backfill_days)
+        return added
+
+    def daily_closes(self, name):
+        """Последнее значение за каждые сутки (UTC)"""
+        closes = {}
+        for point in self.series(name):
+            closes[point[0] // DAY] = point[1]
+        return [closes[day] for day in sorted(closes)]
+
+    def fear_greed_features(self):
+        """Тренд Fear & Greed по локальной истории"""
+        # Догрузка могла не удаться: устаревшее значение не выдаем за текущее
+        if self.is_stale('fear_greed'):
+            return None
+
+        latest = self.series('fear_greed')[-1]
+
+        values = self.daily_closes('fear_greed')
+        avg_7d = sum(values[-7:]) / len(values[-7:])
+        avg_30d = sum(values[-30:]) / len(values[-30:])
+        change_7d = values[-1] - values[-8] if len(values) > 7 else 0
+
+        return {
+            'timestamp': datetime.fromtimestamp(latest[0]).isoformat(),
+            'value': latest[1],
+            'classification': latest[2],
+            'avg_7d': avg_7d,
+            'avg_30d': avg_30d,
+            'change_7d': change_7d
+        }
+
+    def price_features(self, coin_id):
+        """Индикаторы цены по локальной истории (дневные закрытия)"""
+        if self.is_stale(f"price_{coin_id}"):
+            return None
+
+        closes = self.daily_closes(f"price_{coin_id}")
+        if len(closes) < 2:
+            return None
+
+        last_30 = closes[-30:]
+        features = {
+            'price': closes[-1],
+            'sma_7': sum(closes[-7:]) / len(closes[-7:]),
+            'sma_30': sum(last_30) / len(last_30),
+            'change_30d': (closes[-1] / last_30[0] - 1) * 100 if last_30[0] else 0,
+            'rsi_14': None
+        }
+
+        # RSI(14) по Уайлдеру
+        if len(closes) > 14:
+            deltas = [b - a for a, b in zip(closes, closes[1:])]
+            avg_gain = sum(max(d, 0) for d in deltas[:14]) / 14
+            avg_loss = sum(max(-d, 0) for d in deltas[:14]) / 14
+            for d in deltas[14:]:
+                avg_gain = (avg_gain * 13 + max(d, 0)) / 14
+                avg_loss = (avg_loss * 13 + max(-d, 0)) / 14
+            features['rsi_14'] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+
+        return features
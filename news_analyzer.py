@@ -17,6 +17,11 @@ from urllib.parse import urljoin, urlparse, quote_plus
 import hashlib
 from collections import defaultdict, Counter
 
+from artifact_manager import ArtifactManager
+from signal_rules import RuleEngine
+from alert_state import AlertStateEngine
+from history_store import HistoryStore
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -66,6 +71,34 @@ class TradingSignalBot:
         # Кеш обработанных сигналов
         self.processed_signals = self.load_processed_signals()
         
+        # Хранилище выходных артефактов (суточные бандлы + ретеншн)
+        self.artifacts = ArtifactManager(
+            base_dir='artifacts',
+            latest_file='latest_signals.json',
+            compress=True,
+            max_age_days=7,
+            max_total_mb=20
+        )
+        
+        # Правила сигналов (signal_rules.json), компилируются один раз
+        self.rules = RuleEngine('signal_rules.json')
+        
+        # Состояние критических алертов по символам (гистерезис, кулдауны, эскалация)
+        self.alert_state = AlertStateEngine(
+            path='alert_state.jsonl',
+            cooldown_minutes=120,
+            exit_confirmations=2,
+            stale_minutes=90
+        )
+        
+        # Локальная история Fear & Greed и цен (догружается инкрементально)
+        self.history = HistoryStore(
+            self.session,
+            base_dir='history',
+            coins={'BTC': 'bitcoin', 'ETH': 'ethereum'},
+            backfill_days=365
+        )
+        
         # Эмодзи для сигналов
         self.signal_emojis = {
             'BUY': '🟢',
@@ -115,36 +148,27 @@ class TradingSignalBot:
             return False
     
     def get_fear_greed_index(self):
-        """Получаем индекс страха и жадности"""
+        """Получаем индекс страха и жадности (из локальной истории после догрузки)"""
         try:
-            url = "https://api.alternative.me/fng/"
-            response = self.session.get(url, timeout=10)
-            data = response.json()
+            self.history.sync_fear_greed()
+            features = self.history.fear_greed_features()
             
-            if data['data']:
-                value = int(data['data'][0]['value'])
-                classification = data['data'][0]['value_classification']
+            if features:
+                value = features['value']
+                classification = features['classification']
                 
-                # Определяем сигнал
-                if value <= 25:
-                    signal = 'STRONG_BUY'
-                    advice = 'Время покупать! Экстремальный страх'
-                elif value <= 45:
-                    signal = 'BUY'
-                    advice = 'Хорошее время для покупки'
-                elif value >= 75:
-                    signal = 'SELL'
-                    advice = 'Осторожно! Рынок в жадности'
-                else:
-                    signal = 'NEUTRAL'
-                    advice = 'Нейтральное состояние рынка'
+                # Определяем сигнал по правилам (доступны и тренды: avg_7d, avg_30d, change_7d)
+                record = dict(features)
+                rule = self.rules.get('fear_greed').evaluate_one(record)
                 
                 return {
                     'source': '😱 Fear & Greed',
-                    'signal': signal,
+                    'signal': rule.signal if rule else 'NEUTRAL',
                     'value': f"{value}/100",
                     'description': classification,
-                    'advice': advice,
+                    'advice': rule.render(record) if rule else None,
+                    'avg_7d': f"{features['avg_7d']:.0f}",
+                    'change_7d': f"{features['change_7d']:+d}",
                     'timestamp': datetime.now().isoformat()
                 }
         except Exception as e:
@@ -172,20 +196,14 @@ class TradingSignalBot:
                 rsi = row['d'][2]
                 price = row['d'][4]
                 
-                # Преобразуем числовую рекомендацию в сигнал
-                if recommendation > 0.5:
-                    signal = 'BUY'
-                elif recommendation > 0.1:
-                    signal = 'HOLD'
-                elif recommendation < -0.5:
-                    signal = 'SELL'
-                else:
-                    signal = 'NEUTRAL'
+                # Преобразуем числовую рекомендацию в сигнал по правилам
+                record = {'symbol': symbol, 'recommendation': recommendation, 'rsi': rsi, 'price': price}
+                rule = self.rules.get('tradingview').evaluate_one(record)
                 
                 return {
                     'source': f'📈 TradingView {symbol[:3]}',
                     'symbol': symbol,
-                    'signal': signal,
+                    'signal': rule.signal if rule else 'NEUTRAL',
                     'price': f"${price:,.2f}",
                     'rsi': f"{rsi:.1f}",
                     'recommendation': f"{recommendation:.2f}",
@@ -230,23 +248,6 @@ class TradingSignalBot:
                 market_cap = coin.get('market_cap', 0)
                 symbol = coin.get('symbol', '').upper()
                 name = coin.get('name', '')
-                
-                # Генерируем сигналы
-                if change_1h > 8:
-                    signal_strength = 'STRONG_BUY'
-                    signal_reason = f"🚀 Ракета +{change_1h:.1f}% за час!"
-                elif change_1h < -8:
-                    signal_strength = 'STRONG_SELL'  
-                    signal_reason = f"💥 Обвал {change_1h:.1f}% за час!"
-                elif change_24h > 15:
-                    signal_strength = 'BUY'
-                    signal_reason = f"📈 Сильный рост за день"
-                elif change_24h < -15:
-                    signal_strength = 'SELL'
-                    signal_reason = f"📉 Сильное падение за день"
-                else:
-                    signal_strength = 'NEUTRAL'
-                    signal_reason = None
 
                 coin_data = {
                     'rank': i,
@@ -257,21 +258,25 @@ class TradingSignalBot:
                     'change_24h': change_24h,
                     'change_7d': change_7d,
                     'volume': volume,
-                    'market_cap': market_cap,
-                    'signal': signal_strength,
-                    'signal_reason': signal_reason
+                    'market_cap': market_cap
                 }
                 
                 market_data['coins'].append(coin_data)
+            
+            # Генерируем сигналы сразу для всех монет
+            matches = self.rules.evaluate('coin_momentum', market_data['coins'])
+            for coin_data, rule in zip(market_data['coins'], matches):
+                coin_data['signal'] = rule.signal if rule else 'NEUTRAL'
+                coin_data['signal_reason'] = rule.render(coin_data) if rule else None
                 
                 # Добавляем в горячие сигналы
-                if signal_strength in ['STRONG_BUY', 'STRONG_SELL'] and signal_reason:
+                if rule and rule.severity == 'critical' and coin_data['signal_reason']:
                     market_data['hot_signals'].append({
-                        'symbol': symbol,
-                        'signal': signal_strength,
-                        'reason': signal_reason,
-                        'change_1h': change_1h,
-                        'change_24h': change_24h
+                        'symbol': coin_data['symbol'],
+                        'signal': coin_data['signal'],
+                        'reason': coin_data['signal_reason'],
+                        'change_1h': coin_data['change_1h'],
+                        'change_24h': coin_data['change_24h']
                     })
             
             # 2. Глобальные рыночные метрики
@@ -320,6 +325,7 @@ class TradingSignalBot:
                 'name': coin['name'],
                 'signal': coin['signal'],
                 'price': f"${coin['price']:,.2f}",
+                'change_1h': f"{coin['change_1h']:.1f}%",
                 'change_24h': f"{coin['change_24h']:.1f}%",
                 'volume': f"${coin['volume']/1e9:.1f}B" if coin['volume'] > 1e9 else f"${coin['volume']/1e6:.0f}M",
                 'advice': coin['signal_reason'] or f"Изменение {coin['change_24h']:.1f}%",
@@ -340,6 +346,10 @@ class TradingSignalBot:
         if fg_signal:
             all_signals.append(fg_signal)
         
+        # История цен для трендов (только дельта с прошлого цикла)
+        for coin_id in self.history.coins.values():
+            self.history.sync_prices(coin_id)
+        
         # 2. TradingView сигналы для популярных пар
         logger.info("📈 Получаем сигналы TradingView...")
         trading_pairs = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'ADAUSDT']
@@ -375,22 +385,15 @@ class TradingSignalBot:
             if 'data' in global_data:
                 btc_dominance = global_data['data'].get('market_cap_percentage', {}).get('bitcoin', 0)
                 
-                # Анализируем доминацию Bitcoin
-                if btc_dominance > 55:
-                    signal = 'BTC_DOMINANCE_HIGH'
-                    advice = f"Доминация BTC высокая ({btc_dominance:.1f}%) - осторожно с альткоинами"
-                elif btc_dominance < 45:
-                    signal = 'ALTSEASON_POTENTIAL'
-                    advice = f"Доминация BTC низкая ({btc_dominance:.1f}%) - возможен сезон альткоинов"
-                else:
-                    signal = 'NEUTRAL'
-                    advice = f"Доминация BTC нейтральная ({btc_dominance:.1f}%)"
+                # Анализируем доминацию Bitcoin по правилам
+                record = {'btc_dominance': btc_dominance}
+                rule = self.rules.get('btc_dominance').evaluate_one(record)
                 
                 indicators.append({
                     'source': '👑 Bitcoin Dominance',
-                    'signal': signal,
+                    'signal': rule.signal if rule else 'NEUTRAL',
                     'value': f"{btc_dominance:.1f}%",
-                    'advice': advice,
+                    'advice': rule.render(record) if rule else None,
                     'timestamp': datetime.now().isoformat()
                 })
             
@@ -401,25 +404,19 @@ class TradingSignalBot:
             if market_data['coins']:
                 avg_volume = sum(c['volume'] for c in market_data['coins'][:10]) / 10
                 
-                for coin in market_data['coins'][:5]:
-                    volume_ratio = coin['volume'] / avg_volume if avg_volume > 0 else 1
-                    
-                    if volume_ratio > 3 and coin['change_24h'] > 5:
-                        indicators.append({
-                            'source': '🔥 Volume Spike',
-                            'signal': 'HIGH_VOLUME_PUMP',
-                            'symbol': coin['symbol'],
-                            'advice': f"{coin['symbol']} показывает необычно высокий объем торгов ({volume_ratio:.1f}x от среднего)",
-                            'volume_ratio': volume_ratio,
-                            'timestamp': datetime.now().isoformat()
-                        })
-                    elif volume_ratio > 3 and coin['change_24h'] < -5:
+                records = [
+                    dict(coin, volume_ratio=coin['volume'] / avg_volume if avg_volume > 0 else 1)
+                    for coin in market_data['coins'][:5]
+                ]
+                
+                for record, rule in zip(records, self.rules.evaluate('volume_activity', records)):
+                    if rule:
                         indicators.append({
-                            'source': '📊 Volume Alert',
-                            'signal': 'HIGH_VOLUME_DUMP',
-                            'symbol': coin['symbol'],
-                            'advice': f"{coin['symbol']} высокий объем продаж - возможна капитуляция",
-                            'volume_ratio': volume_ratio,
+                            'source': rule.source or '📊 Volume Alert',
+                            'signal': rule.signal,
+                            'symbol': record['symbol'],
+                            'advice': rule.render(record),
+                            'volume_ratio': record['volume_ratio'],
                             'timestamp': datetime.now().isoformat()
                         })
             
@@ -504,6 +501,8 @@ class TradingSignalBot:
         fg_signal = next((s for s in signals if 'Fear & Greed' in s.get('source', '')), None)
         if fg_signal:
             message += f"• Fear & Greed: {fg_signal.get('value', 'N/A')} ({fg_signal.get('description', 'N/A')})\n"
+            if fg_signal.get('avg_7d'):
+                message += f"  Среднее 7д: {fg_signal['avg_7d']} | За неделю: {fg_signal.get('change_7d', 'N/A')}\n"
         
         # Глобальные метрики
         if market_data['global_metrics']:
@@ -533,10 +532,12 @@ class TradingSignalBot:
                 support = btc_data['price'] * 0.95
                 resistance = btc_data['price'] * 1.05
                 message += f"  Поддержка: ${support:,.0f} | Сопротивление: ${resistance:,.0f}\n"
+                message += self.format_history_line('BTC')
             
             if eth_data:
                 trend = "🟢 Бычий" if eth_data['change_24h'] > 2 else "🔴 Медвежий" if eth_data['change_24h'] < -2 else "🟡 Боковик"
                 message += f"• *ETH*: {trend} тренд, цена ${eth_data['price']:,.0f}\n"
+                message += self.format_history_line('ETH')
             
             message += "\n"
         
@@ -578,19 +579,24 @@ class TradingSignalBot:
         
         return message
     
+    def format_history_line(self, symbol):
+        """Строка с индикаторами по локальной истории цены"""
+        coin_id = self.history.coins.get(symbol)
+        features = self.history.price_features(coin_id) if coin_id else None
+        if not features:
+            return ""
+        
+        line = f"  SMA7/30: ${features['sma_7']:,.0f} / ${features['sma_30']:,.0f} | 30д: {features['change_30d']:+.1f}%"
+        if features['rsi_14'] is not None:
+            line += f" | RSI14: {features['rsi_14']:.0f}"
+        return line + "\n"
+    
     def save_signals_to_file(self, signals):
-        """Сохраняем сигналы в файл для анализа"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M')
-        
-        # Детальные данные
-        with open(f'signals_{timestamp}.json', 'w', encoding='utf-8') as f:
-            json.dump(signals, f, ensure_ascii=False, indent=2)
-        
-        # Последние сигналы
-        with open('latest_signals.json', 'w', encoding='utf-8') as f:
-            json.dump(signals, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"💾 Сигналы сохранены: signals_{timestamp}.json")
+        """Сохраняем сигналы в суточный бандл и обновляем снимок последнего цикла"""
+        try:
+            self.artifacts.save(signals)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения сигналов: {e}")
     
     def run_analysis(self):
         """Запускаем полный цикл анализа (расширенная версия)"""
@@ -620,18 +626,22 @@ class TradingSignalBot:
                 logger.info(f"✅ Отправлен расширенный отчет с {len(all_signals)} сигналами")
             
             # Проверяем критически важные сигналы для отдельных уведомлений
-            critical_signals = [
-                s for s in all_signals 
-                if s['signal'] in ['STRONG_BUY', 'STRONG_SELL'] or 
-                (s.get('change_1h', 0) and abs(float(str(s['change_1h']).replace('%', ''))) > 10)
-            ]
-            
-            if critical_signals:
-                critical_message = self.format_critical_alerts(critical_signals)
+            # Алерт уходит только при входе в состояние, эскалации или после кулдауна
+            candidates = self.collect_critical_alerts(all_signals)
+            
+            if candidates:
+                shown = candidates[:5]  # Максимум 5 алертов в сообщении
+                critical_message = self.format_critical_alerts([s for _, s in shown])
                 if critical_message and critical_message != message:  # Не дублируем
                     time.sleep(2)  # Пауза между сообщениями
-                    self.send_telegram_message(critical_message)
-                    logger.info(f"🚨 Отправлены критические алерты: {len(critical_signals)}")
+                    # Отправку фиксируем только для показанных и доставленных алертов
+                    if self.send_telegram_message(critical_message):
+                        for key, signal in shown:
+                            self.alert_state.mark_sent(key, signal['alert_level'])
+                        logger.info(f"🚨 Отправлены критические алерты: {len(shown)}")
+            
+            self.alert_state.expire()
+            self.alert_state.checkpoint()
             
             # Обновляем кеш обработанных сигналов
             self.update_processed_signals_cache(all_signals)
@@ -642,6 +652,55 @@ class TradingSignalBot:
             logger.error(error_msg)
             self.send_telegram_message(f"🚨 *Ошибка бота:*\n{error_msg}")
     
+    def collect_critical_alerts(self, signals):
+        """Прогоняем сигналы через правила critical и состояние алертов"""
+        critical_rules = self.rules.get('critical')
+        records = [
+            dict(s, change_1h=self.parse_number(s.get('change_1h')), value=self.parse_number(s.get('value')))
+            for s in signals
+        ]
+        candidates = []
+        
+        for s, record, rule in zip(signals, records, critical_rules.evaluate(records)):
+            key = self.alert_key(s)
+            
+            if rule and rule.severity == 'critical':
+                level = self.alert_state.observe(
+                    key, True,
+                    level=rule.level_for(record),
+                    side=self.alert_side(record),
+                    rule=rule.index
+                )
+            else:
+                # Выход по exit_when правила, которое открыло алерт
+                index = self.alert_state.active_rule(key)
+                open_rule = critical_rules.rules[index] if index is not None and index < len(critical_rules.rules) else None
+                level = self.alert_state.observe(key, False, exiting=open_rule.exits(record) if open_rule else True)
+            
+            if level:
+                candidates.append((key, dict(s, alert_level=level)))
+        
+        return candidates
+    
+    def alert_key(self, signal):
+        """Ключ состояния алерта: источник + символ"""
+        return f"{signal['source']}|{signal.get('symbol', '')}"
+    
+    def alert_side(self, record):
+        """Направление алерта: BUY или SELL"""
+        if record['signal'] in ['STRONG_BUY', 'BUY']:
+            return 'BUY'
+        if record['signal'] in ['STRONG_SELL', 'SELL']:
+            return 'SELL'
+        return 'BUY' if record['change_1h'] >= 0 else 'SELL'
+    
+    def parse_number(self, value):
+        """Приводим значение ('+5.2%', '20/100', 5.2, None) к числу"""
+        if isinstance(value, (int, float)):
+            return value
+        match = re.match(r'\s*([+-]?\d+(?:\.\d+)?)', str(value or ''))
+        return float(match.group(1)) if match else 0
+    
     def send_long_message(self, message):
         """Отправляем длинное сообщение частями"""
         max_length = 3900  # Оставляем запас
@@ -676,21 +735,25 @@ class TradingSignalBot:
             
         message = f"🚨 *КРИТИЧЕСКИЕ АЛЕРТЫ* {datetime.now().strftime('%H:%M')}\n\n"
         
-        for signal in critical_signals[:5]:  # Максимум 5 алертов
+        # Показываем все переданные алерты: вызывающий код фиксирует их как доставленные
+        for signal in critical_signals:
             emoji = self.signal_emojis.get(signal['signal'], '⚪')
+            message += f"{emoji} *{signal['signal']}*: {signal.get('symbol') or signal.get('source', 'N/A')}\n"
+            
+            if signal.get('alert_level', 1) > 1:
+                message += f"⬆️ Уровень {signal['alert_level']}\n"
+            
+            if signal.get('advice'):
+                message += f"💡 {signal['advice']}\n"
+            elif signal.get('signal_reason'):
+                message += f"💡 {signal['signal_reason']}\n"
             
-            if signal['signal'] in ['STRONG_BUY', 'STRONG_SELL']:
-                message += f"{emoji} *{signal['signal']}*: {signal.get('symbol', 'N/A')}\n"
+            if 'price' in signal:
+                message += f"💰 Цена: {signal['price']}\n"
+            if 'change_1h' in signal:
+                message += f"📊 1ч: {signal['change_1h']}\n"
                 
-                if 'advice' in signal:
-                    message += f"💡 {signal['advice']}\n"
-                elif 'signal_reason' in signal:
-                    message += f"💡 {signal['signal_reason']}\n"
-                    
-                if 'price' in signal:
-                    message += f"💰 Цена: {signal['price']}\n"
-                    
-                message += "\n"
+            message += "\n"
         
         return message if len(message) > 50 else None
     
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📐 Декларативные правила торговых сигналов
+Правила загружаются из signal_rules.json, один раз компилируются в Python-функцию
+и применяются сразу ко всему списку записей за цикл.
+
+Формат файла (наборы с теми же именами заменяют встроенные):
+
+    {
+      "fear_greed": [
+        {"when": "value <= 25", "signal": "STRONG_BUY", "severity": "critical",
+         "message": "Индекс {value}/100 - экстремальный страх"},
+        {"when": "True", "signal": "NEUTRAL"}
+      ]
+    }
+
+Правила внутри набора проверяются по порядку, срабатывает первое подходящее
+(как цепочка if/elif). В условиях доступны поля записи, числа, строки,
+and/or/not, сравнения, in, арифметика и функции abs/min/max/round.
+Отсутствующие поля считаются равными 0, условие с ошибкой вычисления - ложным.
+Для набора critical правило может задать exit_when (условие выхода из алерта)
+и metric/levels (поле и пороги уровней эскалации).
+Ошибка в signal_rules.json не останавливает бота: набор остается встроенным.
+"""
+
+import ast
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Допустимые уровни важности
+SEVERITIES = ('info', 'warning', 'critical')
+
+# Функции, разрешенные в условиях
+ALLOWED_FUNCTIONS = {'abs': abs, 'min': min, 'max': max, 'round': round}
+
+# Узлы AST, разрешенные в условиях
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List, ast.Call
+)
+
+# Встроенные правила (повторяют исходную логику бота)
+DEFAULT_RULES = {
+    # Индекс страха и жадности: поле value (0-100)
+    'fear_greed': [
+        {'when': 'value <= 25', 'signal': 'STRONG_BUY', 'severity': 'critical',
+         'message': 'Время покупать! Экстремальный страх'},
+        {'when': 'value <= 45', 'signal': 'BUY', 'severity': 'warning',
+         'message': 'Хорошее время для покупки'},
+        {'when': 'value >= 75', 'signal': 'SELL', 'severity': 'warning',
+         'message': 'Осторожно! Рынок в жадности'},
+        {'when': 'True', 'signal': 'NEUTRAL',
+         'message': 'Нейтральное состояние рынка'}
+    ],
+    # Рекомендация TradingView: поля recommendation, rsi, price
+    'tradingview': [
+        {'when': 'recommendation > 0.5', 'signal': 'BUY', 'severity': 'warning'},
+        {'when': 'recommendation > 0.1', 'signal': 'HOLD'},
+        {'when': 'recommendation < -0.5', 'signal': 'SELL', 'severity': 'warning'},
+        {'when': 'True', 'signal': 'NEUTRAL'}
+    ],
+    # Движение цены монеты: поля change_1h, change_24h, change_7d, volume, ...
+    'coin_momentum': [
+        {'when': 'change_1h > 8', 'signal': 'STRONG_BUY', 'severity': 'critical',
+         'message': '🚀 Ракета +{change_1h:.1f}% за час!'},
+        {'when': 'change_1h < -8', 'signal': 'STRONG_SELL', 'severity': 'critical',
+         'message': '💥 Обвал {change_1h:.1f}% за час!'},
+        {'when': 'change_24h > 15', 'signal': 'BUY', 'severity': 'warning',
+         'message': '📈 Сильный рост за день'},
+        {'when': 'change_24h < -15', 'signal': 'SELL', 'severity': 'warning',
+         'message': '📉 Сильное падение за день'},
+        {'when': 'True', 'signal': 'NEUTRAL'}
+    ],
+    # Доминация Bitcoin: поле btc_dominance (%)
+    'btc_dominance': [
+        {'when': 'btc_dominance > 55', 'signal': 'BTC_DOMINANCE_HIGH', 'severity': 'warning',
+         'message': 'Доминация BTC высокая ({btc_dominance:.1f}%) - осторожно с альткоинами'},
+        {'when': 'btc_dominance < 45', 'signal': 'ALTSEASON_POTENTIAL', 'severity': 'warning',
+         'message': 'Доминация BTC низкая ({btc_dominance:.1f}%) - возможен сезон альткоинов'},
+        {'when': 'True', 'signal': 'NEUTRAL',
+         'message': 'Доминация BTC нейтральная ({btc_dominance:.1f}%)'}
+    ],
+    # Необычный объем торгов: поля volume_ratio, change_24h, symbol
+    'volume_activity': [
+        {'when': 'volume_ratio > 3 and change_24h > 5', 'signal': 'HIGH_VOLUME_PUMP',
+         'severity': 'warning', 'source': '🔥 Volume Spike',
+         'message': '{symbol} показывает необычно высокий объем торгов ({volume_ratio:.1f}x от среднего)'},
+        {'when': 'volume_ratio > 3 and change_24h < -5', 'signal': 'HIGH_VOLUME_DUMP',
+         'severity': 'warning', 'source': '📊 Volume Alert',
+         'message': '{symbol} высокий объем продаж - возможна капитуляция'}
+    ],
+    # Критические сигналы для отдельных уведомлений: поля source, signal, value, change_1h.
+    # exit_when - условие выхода из алерта (гистерезис), metric/levels - уровни эскалации
+    'critical': [
+        {'when': "source == '😱 Fear & Greed' and value <= 25", 'signal': 'CRITICAL',
+         'severity': 'critical', 'exit_when': 'value > 30'},
+        {'when': 'abs(change_1h) > 10', 'signal': 'CRITICAL', 'severity': 'critical',
+         'metric': 'change_1h', 'levels': [10, 15, 25], 'exit_when': 'abs(change_1h) < 7'},
+        {'when': "signal in ('STRONG_BUY', 'STRONG_SELL')", 'signal': 'CRITICAL',
+         'severity': 'critical', 'metric': 'change_1h', 'levels': [10, 15, 25],
+         'exit_when': "signal not in ('STRONG_BUY', 'STRONG_SELL') and abs(change_1h) < 7"}
+    ]
+}
+
+# Ошибки, которые в условии означают "условие ложно"
+CONDITION_ERRORS = (TypeError, ValueError, ZeroDivisionError)
+
+
+class _ConditionCompiler(ast.NodeTransformer):
+    """Проверяет условие и переименовывает поля записи в локальные переменные"""
+
+    def __init__(self, rule_set, index):
+        self.location = f"{rule_set}[{index}]"
+        self.fields = set()
+
+    def generic_visit(self, node):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"Правило {self.location}: недопустимая конструкция {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in ALLOWED_FUNCTIONS or node.keywords:
+            raise ValueError(f"Правило {self.location}: недопустимый вызов функции")
+        node.func = ast.copy_location(ast.Name(id=f"_fn_{node.func.id}", ctx=ast.Load()), node.func)
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Name(self, node):
+        self.fields.add(node.id)
+        return ast.copy_location(ast.Name(id=f"_f_{node.id}", ctx=ast.Load()), node)
+
+
+def compile_condition(text, rule_set, index):
+    """Проверяем условие и возвращаем его Python-код и список используемых полей"""
+    try:
+        tree = ast.parse(str(text), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Правило {rule_set}[{index}]: синтаксическая ошибка в условии: {e}")
+    compiler = _ConditionCompiler(rule_set, index)
+    tree = compiler.visit(tree)
+    return ast.unparse(tree.body), compiler.fields
+
+
+def build_function(name, lines, filename):
+    """Компилируем сгенерированный код в функцию без доступа к builtins"""
+    namespace = {f"_fn_{func_name}": func for func_name, func in ALLOWED_FUNCTIONS.items()}
+    namespace.update(_set=set, TypeError=TypeError, ValueError=ValueError, ZeroDivisionError=ZeroDivisionError)
+    namespace['__builtins__'] = {}
+    exec(compile('\n'.join(lines), filename, 'exec'), namespace)
+    return namespace[name]
+
+
+def field_lines(fields, indent):
+    """Строки, связывающие поля записи с локальными переменными"""
+    return [f"{indent}_f_{field} = get({field!r}) or 0" for field in sorted(fields)]
+
+
+class Rule:
+    def __init__(self, spec, rule_set, index):
+        location = f"{rule_set}[{index}]"
+        if not isinstance(spec, dict):
+            raise ValueError(f"Правило {location}: ожидается объект, получено {type(spec).__name__}")
+        if 'when' not in spec or 'signal' not in spec:
+            raise ValueError(f"Правило {location}: обязательны поля 'when' и 'signal'")
+        for field in ('when', 'signal', 'exit_when', 'message', 'source', 'metric'):
+            if spec.get(field) is not None and not isinstance(spec[field], str):
+                raise ValueError(f"Правило {location}: поле '{field}' должно быть строкой")
+        if not isinstance(spec.get('levels') or [], list):
+            raise ValueError(f"Правило {location}: поле 'levels' должно быть списком")
+
+        self.when = spec['when']
+        self.signal = spec['signal']
+        self.severity = spec.get('severity', 'info')
+        self.message = spec.get('message')
+        self.source = spec.get('source')
+        # Гистерезис и эскалация (используются состоянием алертов)
+        self.exit_when = spec.get('exit_when')
+        self.metric = spec.get('metric')
+        try:
+            self.levels = sorted(float(level) for level in spec.get('levels') or [])
+        except (TypeError, ValueError):
+            raise ValueError(f"Правило {location}: 'levels' должен содержать числа")
+        self.index = index
+        self.location = location
+
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"Правило {rule_set}[{index}]: неизвестный уровень '{self.severity}'")
+
+        self._exits = None
+        self._exit_failed = False
+        if self.exit_when is not None:
+            condition, fields = compile_condition(self.exit_when, rule_set, index)
+            lines = ["def _exits(r):", "    get = r.get"] + field_lines(fields, "    ")
+            lines.append(f"    return True if {condition} else False")
+            self._exits = build_function('_exits', lines, f"<exit:{self.location}>")
+
+    def exits(self, record):
+        """Можно ли выходить из алерта, открытого этим правилом"""
+        if self._exits is None:
+            # Без exit_when выходим, как только перестало выполняться when
+            return True
+        try:
+            return self._exits(record)
+        except CONDITION_ERRORS:
+            if not self._exit_failed:
+                self._exit_failed = True
+                logger.warning(f"Ошибка вычисления exit_when правила {self.location} - считаем его ложным")
+            return False
+
+    def level_for(self, record):
+        """Уровень эскалации по метрике правила (минимум 1)"""
+        if not self.metric or not self.levels:
+            return 1
+        try:
+            magnitude = abs(float(record.get(self.metric) or 0))
+        except (TypeError, ValueError):
+            return 1
+        return max(sum(1 for threshold in self.levels if magnitude >= threshold), 1)
+
+    def render(self, record):
+        """Подставляем поля записи в шаблон сообщения"""
+        if not self.message:
+            return None
+        try:
+            return self.message.format_map(record)
+        except (KeyError, ValueError, TypeError, IndexError) as e:
+            logger.warning(f"Ошибка шаблона правила '{self.when}': {e}")
+            return self.message
+
+
+class CompiledRuleSet:
+    def __init__(self, name, specs):
+        self.name = name
+        self.rules = [Rule(spec, name, i) for i, spec in enumerate(specs)]
+        self._evaluate_batch = self._compile()
+        # Правила, об ошибках которых уже писали в лог
+        self._reported = set()
+
+    def _compile(self):
+        """Генерируем одну функцию, проходящую по всем записям цепочкой if/elif"""
+        conditions = []
+        fields = set()
+
+        for i, rule in enumerate(self.rules):
+            condition, rule_fields = compile_condition(rule.when, self.name, i)
+            fields |= rule_fields
+            conditions.append(condition)
+
+        # Ошибка в условии (например, строка сравнивается с числом) считается
+        # ложным условием: проверка переходит к следующему правилу
+        lines = [
+            "def _evaluate_batch(records):",
+            "    out = []",
+            "    failed = _set()",
+            "    append = out.append",
+            "    for r in records:",
+            "        get = r.get",
+        ]
+        lines += field_lines(fields, "        ")
+        for i, condition in enumerate(conditions):
+            lines.append("        try:")
+            lines.append(f"            if {condition}:")
+            lines.append(f"                append({i})")
+            lines.append("                continue")
+            lines.append("        except (TypeError, ValueError, ZeroDivisionError):")
+            lines.append(f"            failed.add({i})")
+        lines.append("        append(-1)")
+        lines.append("    return out, failed")
+
+        return build_function('_evaluate_batch', lines, f"<rules:{self.name}>")
+
+    def evaluate(self, records):
+        """Возвращаем сработавшее правило (или None) для каждой записи"""
+        rules = self.rules
+        matches, failed = self._evaluate_batch(records)
+
+        for i in failed - self._reported:
+            logger.warning(f"Ошибка вычисления правила {self.name}[{i}] '{rules[i].when}' - считаем его ложным")
+        self._reported |= failed
+
+        return [rules[i] if i >= 0 else None for i in matches]
+
+    def evaluate_one(self, record):
+        """Возвращаем сработавшее правило для одной записи"""
+        return self.evaluate([record])[0]
+
+
+class RuleEngine:
+    def __init__(self, config_path='signal_rules.json'):
+        self.config_path = config_path
+        self.rule_sets = {}
+
+        # Компилируем все наборы один раз при старте
+        for name, rules in DEFAULT_RULES.items():
+            self.rule_sets[name] = CompiledRuleSet(name, rules)
+
+        # Пользовательский набор с ошибкой не ломает бота: остается встроенный
+        for name, rules in self.load_config().items():
+            try:
+                self.rule_sets[name] = CompiledRuleSet(name, rules)
+            except (ValueError, TypeError) as e:
+                logger.error(f"❌ Набор правил '{name}' пропущен: {e}")
+
+        logger.info(f"📐 Загружено наборов правил: {len(self.rule_sets)}")
+
+    def load_config(self):
+        """Загружаем пользовательские правила из локального файла"""
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Ошибка чтения {self.config_path}, используем встроенные правила: {e}")
+            return {}
+
+        if not isinstance(config, dict) or not all(isinstance(v, list) for v in config.values()):
+            logger.error(f"❌ {self.config_path}: ожидается объект вида {{\"набор\": [правила]}}, используем встроенные правила")
+            return {}
+
+        logger.info(f"📐 Пользовательские правила: {self.config_path} ({', '.join(config)})")
+        return config
+
+    def get(self, name):
+        """Возвращаем скомпилированный набор правил"""
+        return self.rule_sets[name]
+
+    def evaluate(self, name, records):
+        """Применяем набор правил ко всем записям"""
+        return self.rule_sets[name].evaluate(records)
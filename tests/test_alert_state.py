@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Переходы состояния алертов: вход, эскалация, гистерезис выхода, кулдаун"""
+
+import pytest
+
+from alert_state import AlertStateEngine
+from signal_rules import RuleEngine
+
+CYCLE = 1800
+START = 1_000_000
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return AlertStateEngine(str(tmp_path / 'alert_state.jsonl'), cooldown_minutes=120,
+                            exit_confirmations=2, stale_minutes=90)
+
+
+@pytest.fixture
+def critical(tmp_path):
+    return RuleEngine(str(tmp_path / 'signal_rules.json')).get('critical')
+
+
+def run_cycles(engine, critical, records, key='k'):
+    """Прогоняем записи по циклам как collect_critical_alerts(), доставка всегда успешна"""
+    sent = []
+    for i, record in enumerate(records):
+        now = START + i * CYCLE
+        rule = critical.evaluate_one(record)
+        if rule:
+            level = engine.observe(key, True, level=rule.level_for(record), side='BUY', rule=rule.index, now=now)
+        else:
+            index = engine.active_rule(key)
+            open_rule = critical.rules[index] if index is not None else None
+            level = engine.observe(key, False, exiting=open_rule.exits(record) if open_rule else True, now=now)
+        if level:
+            engine.mark_sent(key, level, now=now)
+        sent.append(level)
+    return sent
+
+
+def fear_greed(value):
+    return {'source': '😱 Fear & Greed', 'signal': 'NEUTRAL', 'value': value, 'change_1h': 0}
+
+
+def price(change_1h):
+    return {'source': '💰 Enhanced Price Alert', 'signal': 'NEUTRAL', 'change_1h': change_1h}
+
+
+def test_entry_fires_once_while_active(engine, critical):
+    assert run_cycles(engine, critical, [price(11), price(12), price(11)]) == [1, None, None]
+
+
+def test_escalation_fires_on_higher_level_only(engine, critical):
+    assert run_cycles(engine, critical, [price(11), price(16), price(12), price(26)]) == [1, 2, None, 3]
+
+
+def test_exit_hysteresis_on_rule_metric(engine, critical):
+    # Fear & Greed открывается при <= 25 и держится, пока значение не выше 30
+    sent = run_cycles(engine, critical, [fear_greed(v) for v in (24, 26, 25, 28, 24, 29, 26)])
+    assert sent == [1, None, None, None, None, None, None]
+    assert engine.states['k']['active']
+
+
+def test_exit_requires_confirmations(engine, critical):
+    run_cycles(engine, critical, [price(11), price(5)])
+    assert engine.states['k']['active']
+    engine.observe('k', False, exiting=True, now=START + 2 * CYCLE)
+    assert not engine.states['k']['active']
+
+
+def test_reentry_suppressed_by_cooldown(engine, critical):
+    # Выход через 2 цикла, повторный вход внутри кулдауна (2ч) - без алерта,
+    # после кулдауна - снова алерт
+    sent = run_cycles(engine, critical, [price(11), price(1), price(1), price(11), price(1), price(1), price(11)])
+    assert sent == [1, None, None, None, None, None, 1]
+
+
+def test_reentry_with_higher_level_bypasses_cooldown(engine, critical):
+    sent = run_cycles(engine, critical, [price(11), price(1), price(1), price(16)])
+    assert sent == [1, None, None, 2]
+
+
+def test_undelivered_alert_is_retried(engine):
+    assert engine.observe('k', True, level=1, side='BUY', now=START) == 1
+    # mark_sent() не вызван - отправка не удалась
+    assert engine.observe('k', True, level=1, side='BUY', now=START + CYCLE) == 1
+
+
+def test_stale_active_entry_is_deactivated(engine):
+    engine.observe('k', True, level=1, side='BUY', now=START)
+    engine.mark_sent('k', 1, now=START)
+    engine.expire(now=START + 90 * 60)
+    assert not engine.states['k']['active']
+
+
+def test_checkpoint_survives_torn_and_malformed_lines(tmp_path):
+    path = tmp_path / 'alert_state.jsonl'
+    path.write_text('[1,2]\n{"k":"x","s":{}}\n{"k":"a","s":{"act', encoding='utf-8')
+
+    engine = AlertStateEngine(str(path))
+    engine.observe('q', True, level=1, side='BUY')
+    engine.checkpoint()
+
+    assert set(AlertStateEngine(str(path)).states) == {'q'}
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Ретеншн суточных бандлов: по возрасту и по объему"""
+
+import os
+from datetime import datetime, timedelta
+
+from artifact_manager import ArtifactManager
+
+
+def make_bundle(manager, day, size):
+    """Создаем бандл заданного размера"""
+    path = manager.bundle_path(day)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def bundle_names(manager):
+    return [name for name, _, _ in manager.list_bundles()]
+
+
+def test_retention_by_age(tmp_path):
+    manager = ArtifactManager(base_dir=str(tmp_path), latest_file=str(tmp_path / 'latest_signals.json'),
+                              max_age_days=3)
+    now = datetime(2026, 1, 10, 12, 0)
+    for days_ago in range(6):
+        make_bundle(manager, now - timedelta(days=days_ago), 10)
+
+    removed = manager.enforce_retention(now)
+
+    assert len(removed) == 2
+    assert bundle_names(manager) == [manager.bundle_name(now - timedelta(days=d)) for d in (3, 2, 1, 0)]
+
+
+def test_retention_by_size_keeps_current_bundle(tmp_path):
+    manager = ArtifactManager(base_dir=str(tmp_path), latest_file=str(tmp_path / 'latest_signals.json'),
+                              max_age_days=30, max_total_mb=2.5 / 1024)  # 2560 байт
+    now = datetime(2026, 1, 10, 12, 0)
+    for days_ago in (3, 2, 1):
+        make_bundle(manager, now - timedelta(days=days_ago), 1000)
+
+    # Текущий бандл сам по себе больше лимита, но удалять его нельзя
+    manager.save([{'signal': 'BUY'}], now=now)
+    with open(manager.bundle_path(now), 'ab') as f:
+        f.write(b'x' * 3000)
+    manager.enforce_retention(now)
+
+    assert bundle_names(manager) == [manager.bundle_name(now)]
+
+
+def test_retention_by_size_removes_oldest_first(tmp_path):
+    manager = ArtifactManager(base_dir=str(tmp_path), latest_file=str(tmp_path / 'latest_signals.json'),
+                              max_age_days=30, max_total_mb=2.5 / 1024)
+    now = datetime(2026, 1, 10, 12, 0)
+    for days_ago in (4, 3, 2, 1):
+        make_bundle(manager, now - timedelta(days=days_ago), 1000)
+
+    removed = manager.enforce_retention(now)
+
+    assert [os.path.basename(p) for p in removed] == [manager.bundle_name(now - timedelta(days=d)) for d in (4, 3)]
+    assert len(bundle_names(manager)) == 2
+
+
+def test_save_writes_compact_snapshot_and_pointer(tmp_path):
+    manager = ArtifactManager(base_dir=str(tmp_path), latest_file=str(tmp_path / 'latest_signals.json'))
+    now = datetime(2026, 1, 10, 12, 0)
+
+    bundle = manager.save([{'signal': 'BUY', 'symbol': 'BTC'}], now=now)
+
+    assert os.path.basename(bundle) == 'signals_20260110.jsonl.gz'
+    assert (tmp_path / 'latest_signals.json').read_text(encoding='utf-8') == '[{"signal":"BUY","symbol":"BTC"}]'
+    assert '"bundle":"signals_20260110.jsonl.gz"' in (tmp_path / 'latest.json').read_text(encoding='utf-8')
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Встроенные наборы правил повторяют прежние цепочки if/elif бота"""
+
+import itertools
+
+import pytest
+
+from signal_rules import CompiledRuleSet, RuleEngine
+
+
+# Прежняя логика из news_analyzer.py (до перехода на правила)
+
+def legacy_fear_greed(value):
+    if value <= 25:
+        return 'STRONG_BUY', 'Время покупать! Экстремальный страх'
+    elif value <= 45:
+        return 'BUY', 'Хорошее время для покупки'
+    elif value >= 75:
+        return 'SELL', 'Осторожно! Рынок в жадности'
+    return 'NEUTRAL', 'Нейтральное состояние рынка'
+
+
+def legacy_tradingview(recommendation):
+    if recommendation > 0.5:
+        return 'BUY'
+    elif recommendation > 0.1:
+        return 'HOLD'
+    elif recommendation < -0.5:
+        return 'SELL'
+    return 'NEUTRAL'
+
+
+def legacy_coin_momentum(change_1h, change_24h):
+    if change_1h > 8:
+        return 'STRONG_BUY', f"🚀 Ракета +{change_1h:.1f}% за час!"
+    elif change_1h < -8:
+        return 'STRONG_SELL', f"💥 Обвал {change_1h:.1f}% за час!"
+    elif change_24h > 15:
+        return 'BUY', "📈 Сильный рост за день"
+    elif change_24h < -15:
+        return 'SELL', "📉 Сильное падение за день"
+    return 'NEUTRAL', None
+
+
+def legacy_btc_dominance(btc_dominance):
+    if btc_dominance > 55:
+        return 'BTC_DOMINANCE_HIGH', f"Доминация BTC высокая ({btc_dominance:.1f}%) - осторожно с альткоинами"
+    elif btc_dominance < 45:
+        return 'ALTSEASON_POTENTIAL', f"Доминация BTC низкая ({btc_dominance:.1f}%) - возможен сезон альткоинов"
+    return 'NEUTRAL', f"Доминация BTC нейтральная ({btc_dominance:.1f}%)"
+
+
+def legacy_volume_activity(symbol, volume_ratio, change_24h):
+    if volume_ratio > 3 and change_24h > 5:
+        return ('🔥 Volume Spike', 'HIGH_VOLUME_PUMP',
+                f"{symbol} показывает необычно высокий объем торгов ({volume_ratio:.1f}x от среднего)")
+    elif volume_ratio > 3 and change_24h < -5:
+        return '📊 Volume Alert', 'HIGH_VOLUME_DUMP', f"{symbol} высокий объем продаж - возможна капитуляция"
+    return None
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Пользовательского файла нет - только встроенные правила
+    return RuleEngine(str(tmp_path / 'signal_rules.json'))
+
+
+def result(rule, record):
+    return (rule.signal, rule.render(record)) if rule else None
+
+
+def test_fear_greed_matches_legacy(engine):
+    records = [{'value': value} for value in range(0, 101)]
+    matches = engine.evaluate('fear_greed', records)
+    assert [result(rule, r) for rule, r in zip(matches, records)] == [legacy_fear_greed(r['value']) for r in records]
+
+
+def test_tradingview_matches_legacy(engine):
+    values = [-1, -0.51, -0.5, -0.2, 0, 0.1, 0.11, 0.3, 0.5, 0.51, 1]
+    matches = engine.evaluate('tradingview', [{'recommendation': v} for v in values])
+    assert [rule.signal for rule in matches] == [legacy_tradingview(v) for v in values]
+
+
+def test_coin_momentum_matches_legacy(engine):
+    grid = [-20, -8.01, -8, 0, 8, 8.01, 20]
+    daily = [-30, -15.01, -15, 0, 15, 15.01, 30]
+    records = [{'change_1h': h, 'change_24h': d} for h, d in itertools.product(grid, daily)]
+    matches = engine.evaluate('coin_momentum', records)
+    expected = [legacy_coin_momentum(r['change_1h'], r['change_24h']) for r in records]
+    assert [result(rule, r) for rule, r in zip(matches, records)] == expected
+
+
+def test_hot_signals_are_critical_momentum(engine):
+    rules = engine.evaluate('coin_momentum', [{'change_1h': 9}, {'change_1h': -9}, {'change_24h': 20}])
+    assert [rule.severity for rule in rules] == ['critical', 'critical', 'warning']
+
+
+def test_btc_dominance_matches_legacy(engine):
+    records = [{'btc_dominance': v} for v in (30, 44.9, 45, 50, 55, 55.1, 70)]
+    matches = engine.evaluate('btc_dominance', records)
+    assert [result(rule, r) for rule, r in zip(matches, records)] == [legacy_btc_dominance(r['btc_dominance']) for r in records]
+
+
+def test_volume_activity_matches_legacy(engine):
+    records = [
+        {'symbol': 'BTC', 'volume_ratio': ratio, 'change_24h': change}
+        for ratio, change in itertools.product((1, 3, 3.5, 10), (-10, -5, 0, 5, 10))
+    ]
+    matches = engine.evaluate('volume_activity', records)
+    actual = [(rule.source, rule.signal, rule.render(r)) if rule else None for rule, r in zip(matches, records)]
+    expected = [legacy_volume_activity(r['symbol'], r['volume_ratio'], r['change_24h']) for r in records]
+    assert actual == expected
+
+
+def test_critical_matches_legacy_filter(engine):
+    signals = [
+        {'source': '💰 Enhanced Price Alert', 'signal': 'STRONG_BUY', 'change_1h': 9},
+        {'source': '💰 Enhanced Price Alert', 'signal': 'NEUTRAL', 'change_1h': 10.5},
+        {'source': '💰 Enhanced Price Alert', 'signal': 'NEUTRAL', 'change_1h': -11},
+        {'source': '💰 Enhanced Price Alert', 'signal': 'BUY', 'change_1h': 10},
+        {'source': '📈 TradingView BTC', 'signal': 'STRONG_SELL'},
+    ]
+    matches = engine.evaluate('critical', signals)
+    assert [bool(rule and rule.severity == 'critical') for rule in matches] == [True, True, True, False, True]
+
+
+def test_condition_error_falls_through_to_next_rule():
+    rule_set = CompiledRuleSet('t', [{'when': 'x > 5', 'signal': 'A'}, {'when': 'True', 'signal': 'B'}])
+    assert [rule.signal for rule in rule_set.evaluate([{'x': 'abc'}, {'x': 9}])] == ['B', 'A']
+
+
+@pytest.mark.parametrize('config', [
+    '{bad',
+    '[1]',
+    '{"critical": [1]}',
+    '{"critical": [{"when": 5, "signal": "X"}]}',
+    '{"critical": [{"when": "x.y", "signal": "X"}]}',
+    '{"critical": [{"when": "True", "signal": "X", "levels": [1, "a"]}]}',
+])
+def test_bad_config_keeps_builtin_rules(tmp_path, config):
+    path = tmp_path / 'signal_rules.json'
+    path.write_text(config, encoding='utf-8')
+    engine = RuleEngine(str(path))
+    assert len(engine.get('critical').rules) == 3